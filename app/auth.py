@@ -1,19 +1,29 @@
 from __future__ import annotations
 
+import functools
+import hashlib
+import json
+import threading
 from typing import Any
 
 from authlib.integrations.starlette_client import OAuth, OAuthError
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse
 from sqlmodel import Session, select
 
 from app.config import settings
-from app.db import get_session
+from app.db import get_session_rw
 from app.models import DormUser
 
 
 oauth = OAuth()
 
+# Parsed DormUser per distinct session payload, so validation runs once a minute at most.
+_user_cache: TTLCache[str, DormUser] = TTLCache(maxsize=10_000, ttl=60)
+_user_cache_lock = threading.Lock()
+
 
 def configure_oauth() -> None:
     if settings.google_client_id and settings.google_client_secret:
@@ -26,7 +36,9 @@ def configure_oauth() -> None:
         )
 
 
+@functools.lru_cache(maxsize=1)
 def is_auth_configured() -> bool:
+    # Settings are loaded once at import, so the answer never changes.
     return bool(settings.google_client_id and settings.google_client_secret and settings.google_redirect_uri)
 
 
@@ -36,7 +48,18 @@ def get_current_user(request: Request) -> DormUser | None:
         return None
 
     try:
-        return DormUser(
+        cache_key = hashlib.blake2b(json.dumps(user_dict, sort_keys=True).encode(), digest_size=16).hexdigest()
+    except (TypeError, ValueError):
+        cache_key = None
+
+    if cache_key is not None:
+        with _user_cache_lock:
+            cached = _user_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    try:
+        user = DormUser(
             id=user_dict.get("id"),
             email=user_dict.get("email"),
             name=user_dict.get("name"),
@@ -45,6 +68,11 @@ def get_current_user(request: Request) -> DormUser | None:
     except Exception:
         return None
 
+    if cache_key is not None:
+        with _user_cache_lock:
+            _user_cache[cache_key] = user
+    return user
+
 
 def require_user(request: Request) -> DormUser:
     user = get_current_user(request)
@@ -71,13 +99,11 @@ def upsert_user_from_google(*, session: Session, userinfo: dict[str, Any]) -> Do
         existing.picture_url = picture
         session.add(existing)
         session.commit()
-        session.refresh(existing)
         return existing
 
     user = DormUser(email=email, name=name, picture_url=picture)
     session.add(user)
     session.commit()
-    session.refresh(user)
     return user
 
 
@@ -91,7 +117,7 @@ async def google_login(request: Request) -> RedirectResponse:
     return await oauth.google.authorize_redirect(request, redirect_uri)
 
 
-async def google_callback(request: Request, session: Session = Depends(get_session)) -> RedirectResponse:
+async def google_callback(request: Request, session: Session = Depends(get_session_rw)) -> RedirectResponse:
     try:
         token = await oauth.google.authorize_access_token(request)
     except OAuthError:
@@ -108,7 +134,8 @@ async def google_callback(request: Request, session: Session = Depends(get_sessi
     if not userinfo or not userinfo.get("email"):
         return RedirectResponse(url="/login?error=Could%20not%20read%20Google%20profile", status_code=303)
 
-    user = upsert_user_from_google(session=session, userinfo=userinfo)
+    # Blocking SQLite work (and the single-connection writer pool checkout) must stay off the event loop.
+    user = await run_in_threadpool(upsert_user_from_google, session=session, userinfo=userinfo)
 
     request.session["user"] = {
         "id": user.id,
@@ -29,6 +29,8 @@ class Settings(BaseSettings):
     smtp_password: str | None = None
     smtp_from: str | None = None
     smtp_use_tls: bool = True
+    # Reconnect after this many messages on one pooled connection
+    smtp_max_messages_per_connection: int = 1000
 
 
 settings = Settings()
@@ -1,19 +1,123 @@
 from __future__ import annotations
 
+import os
+from collections.abc import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from sqlmodel import SQLModel, Session, create_engine
 
 DATABASE_URL = "sqlite:///./dorm.db"
+DATABASE_URL_RO = "sqlite:///file:./dorm.db?mode=ro&uri=true"
+
+# Applied once per new DBAPI connection. WAL lets readers proceed while a write
+# is in flight; synchronous=NORMAL is safe under WAL and fsyncs only on checkpoint.
+SQLITE_PRAGMAS = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA busy_timeout=5000;
+PRAGMA temp_store=memory;
+PRAGMA cache_size=-20000;
+PRAGMA foreign_keys=ON;
+"""
+
+# journal_mode/synchronous are persisted by (or only matter to) the writer.
+SQLITE_PRAGMAS_RO = """
+PRAGMA busy_timeout=5000;
+PRAGMA temp_store=memory;
+PRAGMA cache_size=-20000;
+"""
+
+
+# Full-text index over student name/email backing the /students search. It is an
+# external-content table, so triggers keep it in step with the student table.
+STUDENTS_FTS_DDL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5(name, email, content='student', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS students_fts_ai AFTER INSERT ON student BEGIN
+    INSERT INTO students_fts(rowid, name, email) VALUES (new.id, new.name, new.email);
+END;
+CREATE TRIGGER IF NOT EXISTS students_fts_ad AFTER DELETE ON student BEGIN
+    INSERT INTO students_fts(students_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+END;
+CREATE TRIGGER IF NOT EXISTS students_fts_au AFTER UPDATE ON student BEGIN
+    INSERT INTO students_fts(students_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+    INSERT INTO students_fts(rowid, name, email) VALUES (new.id, new.name, new.email);
+END;
+"""
+
+
+def _create_sqlite_engine(url: str, *, pragmas: str, pool_size: int, max_overflow: int) -> Engine:
+    new_engine = create_engine(
+        url,
+        echo=False,
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,
+        # isolation_level=None stops pysqlite from issuing its own implicit BEGINs;
+        # SQLAlchemy emits BEGIN itself (see _sqlite_begin below).
+        connect_args={"check_same_thread": False, "isolation_level": None},
+    )
+
+    @event.listens_for(new_engine, "connect")
+    def _sqlite_on_connect(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.executescript(pragmas)
+        finally:
+            cursor.close()
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=False,
-    connect_args={"check_same_thread": False},
+    @event.listens_for(new_engine, "begin")
+    def _sqlite_begin(conn) -> None:
+        conn.exec_driver_sql("BEGIN")
+
+    return new_engine
+
+
+# SQLite serializes writers anyway, so one read-write connection avoids SQLITE_BUSY
+# contention between our own threads; reads go through a separate read-only pool.
+engine_rw = _create_sqlite_engine(DATABASE_URL, pragmas=SQLITE_PRAGMAS, pool_size=1, max_overflow=0)
+engine_ro = _create_sqlite_engine(
+    DATABASE_URL_RO, pragmas=SQLITE_PRAGMAS_RO, pool_size=os.cpu_count() or 4, max_overflow=10
 )
 
+# Handlers keep using objects after commit (redirect URLs, upserted users), so don't
+# expire them and force a reload SELECT.
+SessionLocal = sessionmaker(bind=engine_rw, class_=Session, expire_on_commit=False)
+SessionLocalRO = sessionmaker(bind=engine_ro, class_=Session, expire_on_commit=False)
+
 
 def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
+    SQLModel.metadata.create_all(engine_rw)
+    # create_all skips tables that already exist, so add indexes introduced since then
+    # and drop ones that have been superseded.
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine_rw, checkfirst=True)
+    with engine_rw.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX IF EXISTS ix_dailyreport_report_date")
+        conn.exec_driver_sql("DROP INDEX IF EXISTS ix_dailyreport_student_id")
+
+    raw_conn = engine_rw.raw_connection()
+    try:
+        fts_exists = raw_conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students_fts'"
+        ).fetchone()
+        raw_conn.executescript(STUDENTS_FTS_DDL)
+        if not fts_exists:
+            # Index students created before the FTS table existed.
+            raw_conn.execute("INSERT INTO students_fts(students_fts) VALUES ('rebuild')")
+    finally:
+        raw_conn.close()
+
+
+def get_session_rw() -> Iterator[Session]:
+    with SessionLocal() as session:
+        yield session
 
 
-def get_session() -> Session:
-    return Session(engine)
+def get_session_ro() -> Iterator[Session]:
+    with SessionLocalRO() as session:
+        yield session
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 import smtplib
+import threading
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager
 from email.message import EmailMessage
 
 from app.config import settings
@@ -17,6 +20,77 @@ def ensure_email_configured() -> None:
         )
 
 
+class SMTPConnectionHolder:
+    """Keeps one logged-in SMTP connection alive across background sends."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._conn: smtplib.SMTP | None = None
+        self._sent = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=20)
+        try:
+            smtp.ehlo()
+            if settings.smtp_use_tls:
+                smtp.starttls()
+                smtp.ehlo()
+            if settings.smtp_username and settings.smtp_password:
+                smtp.login(settings.smtp_username, settings.smtp_password)
+        except Exception:
+            smtp.close()
+            raise
+        return smtp
+
+    def _is_alive(self, smtp: smtplib.SMTP) -> bool:
+        try:
+            return smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _drop(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.quit()
+        except (smtplib.SMTPException, OSError):
+            self._conn.close()
+        self._conn = None
+        self._sent = 0
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        with self._lock:
+            if self._conn is None or not self._is_alive(self._conn):
+                self._drop()
+                self._conn = self._connect()
+            try:
+                yield self._conn
+            except (smtplib.SMTPServerDisconnected, OSError):
+                # Don't hand a broken connection to the next sender.
+                self._drop()
+                raise
+            # Each borrow sends one message; recycle before providers cut us off.
+            self._sent += 1
+            if self._sent >= settings.smtp_max_messages_per_connection:
+                self._drop()
+
+    def close(self) -> None:
+        with self._lock:
+            self._drop()
+
+
+_smtp_holder = SMTPConnectionHolder()
+
+
+def get_smtp() -> AbstractContextManager[smtplib.SMTP]:
+    return _smtp_holder.connection()
+
+
+def close_smtp() -> None:
+    _smtp_holder.close()
+
+
 def send_email(*, to_email: str, subject: str, html_body: str, text_body: str) -> None:
     ensure_email_configured()
 
@@ -29,11 +103,5 @@ def send_email(*, to_email: str, subject: str, html_body: str, text_body: str) -
     message.set_content(text_body)
     message.add_alternative(html_body, subtype="html")
 
-    with smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=20) as smtp:
-        smtp.ehlo()
-        if settings.smtp_use_tls:
-            smtp.starttls()
-            smtp.ehlo()
-        if settings.smtp_username and settings.smtp_password:
-            smtp.login(settings.smtp_username, settings.smtp_password)
+    with get_smtp() as smtp:
         smtp.send_message(message)
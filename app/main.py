@@ -1,27 +1,31 @@
 from __future__ import annotations
 
+import re
+import secrets
+import shutil
 from datetime import date
 from pathlib import Path
 from typing import Optional
-from uuid import uuid4
 
 from fastapi import BackgroundTasks, Depends, FastAPI, File, Form, HTTPException, Request, UploadFile
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
+from sqlalchemy import column, text
 from sqlmodel import Session, delete, select
 
 from app.auth import configure_oauth, google_callback, google_login, is_auth_configured, require_user_or_redirect
 from app.config import settings
-from app.db import get_session, init_db
-from app.emailer import EmailNotConfiguredError, ensure_email_configured, send_email
+from app.db import get_session_ro, get_session_rw, init_db
+from app.emailer import EmailNotConfiguredError, close_smtp, ensure_email_configured, send_email
 from app.models import DailyReport, Student
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 STATIC_DIR = BASE_DIR / "static"
 UPLOADS_DIR = STATIC_DIR / "uploads"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 # StaticFiles requires directories to exist at mount time.
 STATIC_DIR.mkdir(parents=True, exist_ok=True)
@@ -37,6 +41,10 @@ app.add_middleware(
 )
 
 templates = Jinja2Templates(directory=str((Path(__file__).parent / "templates").resolve()))
+# Only stat templates for changes while developing.
+templates.env.auto_reload = settings.dev_mode
+
+EMAIL_REPORT_TEMPLATE = templates.get_template("email_report.html")
 
 # Serve static + uploads
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
@@ -48,6 +56,13 @@ def _startup() -> None:
     UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
     init_db()
     configure_oauth()
+    templates.env.globals["google_configured"] = is_auth_configured()
+    templates.env.globals["dev_mode"] = settings.dev_mode
+
+
+@app.on_event("shutdown")
+def _shutdown() -> None:
+    close_smtp()
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -55,26 +70,16 @@ def home() -> RedirectResponse:
     return RedirectResponse(url="/students", status_code=303)
 
 
-def _flash_from_query(request: Request) -> dict:
-    qp = request.query_params
-    flash_success = qp.get("success")
-    flash_error = qp.get("error")
-    out: dict = {}
+def _base_template_context(request: Request) -> dict:
+    # google_configured / dev_mode are Jinja globals, set once at startup.
+    context: dict = {"current_user": request.session.get("user")}
+    flash_success = request.query_params.get("success")
     if flash_success:
-        out["flash_success"] = flash_success
+        context["flash_success"] = flash_success
+    flash_error = request.query_params.get("error")
     if flash_error:
-        out["flash_error"] = flash_error
-    return out
-
-
-def _base_template_context(request: Request) -> dict:
-    user = request.session.get("user")
-    return {
-        "current_user": user,
-        "google_configured": is_auth_configured(),
-        "dev_mode": settings.dev_mode,
-        **_flash_from_query(request),
-    }
+        context["flash_error"] = flash_error
+    return context
 
 
 def _require_login(request: Request) -> RedirectResponse | None:
@@ -119,19 +124,30 @@ async def auth_google(request: Request):
 
 
 @app.get("/auth/google/callback")
-async def auth_google_callback(request: Request, session: Session = Depends(get_session)):
+async def auth_google_callback(request: Request, session: Session = Depends(get_session_rw)):
     return await google_callback(request, session)
 
 
+_FTS_SAFE_QUERY = re.compile(r"[\w\s]+")
+_STUDENTS_FTS_MATCH = text("SELECT rowid FROM students_fts WHERE students_fts MATCH :match").columns(
+    column("rowid")
+)
+
+
 @app.get("/students", response_class=HTMLResponse)
-def students_page(request: Request, session: Session = Depends(get_session)):
+def students_page(request: Request, session: Session = Depends(get_session_ro)):
     redirect = _require_login(request)
     if redirect:
         return redirect
 
     q = (request.query_params.get("q") or "").strip()
     stmt = select(Student)
-    if q:
+    if q and _FTS_SAFE_QUERY.fullmatch(q):
+        # Prefix-match every word via the students_fts index.
+        match = " ".join(f'"{term}"*' for term in q.split())
+        stmt = stmt.where(Student.id.in_(_STUDENTS_FTS_MATCH.bindparams(match=match)))
+    elif q:
+        # Punctuation (e.g. a full email address) would need FTS query escaping; use LIKE.
         stmt = stmt.where((Student.name.contains(q)) | (Student.email.contains(q)))
     students = session.exec(stmt.order_by(Student.created_at.desc())).all()
     return templates.TemplateResponse(
@@ -145,7 +161,7 @@ def create_student(
     request: Request,
     name: str = Form(...),
     email: str = Form(...),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_session_rw),
 ) -> RedirectResponse:
     redirect = _require_login(request)
     if redirect:
@@ -153,7 +169,6 @@ def create_student(
     student = Student(name=name.strip(), email=email.strip())
     session.add(student)
     session.commit()
-    session.refresh(student)
     return RedirectResponse(url=f"/students/{student.id}", status_code=303)
 
 
@@ -161,7 +176,7 @@ def create_student(
 def student_edit_page(
     student_id: int,
     request: Request,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_session_ro),
 ):
     redirect = _require_login(request)
     if redirect:
@@ -181,7 +196,7 @@ def student_edit_submit(
     request: Request,
     name: str = Form(...),
     email: str = Form(...),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_session_rw),
 ) -> RedirectResponse:
     redirect = _require_login(request)
     if redirect:
@@ -196,13 +211,18 @@ def student_edit_submit(
     return RedirectResponse(url=f"/students/{student_id}?success=Student%20updated", status_code=303)
 
 
-def _try_delete_uploaded_file(image_path: str | None) -> None:
+def _uploaded_file_disk_path(image_path: str | None) -> Path | None:
     if not image_path:
-        return
+        return None
     if not image_path.startswith("/uploads/"):
+        return None
+    return UPLOADS_DIR / image_path.removeprefix("/uploads/")
+
+
+def _try_delete_uploaded_file(image_path: str | None) -> None:
+    disk_path = _uploaded_file_disk_path(image_path)
+    if disk_path is None:
         return
-    filename = image_path.removeprefix("/uploads/")
-    disk_path = UPLOADS_DIR / filename
     try:
         if disk_path.exists() and disk_path.is_file():
             disk_path.unlink()
@@ -211,11 +231,25 @@ def _try_delete_uploaded_file(image_path: str | None) -> None:
         pass
 
 
+def _bulk_unlink(image_paths: list[str]) -> None:
+    # Background cleanup after the DB commit; unlink directly rather than stat first.
+    for image_path in image_paths:
+        disk_path = _uploaded_file_disk_path(image_path)
+        if disk_path is None:
+            continue
+        try:
+            disk_path.unlink(missing_ok=True)
+        except OSError:
+            # Best-effort cleanup only
+            pass
+
+
 @app.post("/students/{student_id}/delete")
 def student_delete(
     student_id: int,
     request: Request,
-    session: Session = Depends(get_session),
+    background: BackgroundTasks,
+    session: Session = Depends(get_session_rw),
 ) -> RedirectResponse:
     redirect = _require_login(request)
     if redirect:
@@ -224,16 +258,21 @@ def student_delete(
     if not student:
         return RedirectResponse(url="/students?error=Student%20not%20found", status_code=303)
 
-    # Cleanup uploaded images for this student's reports
-    reports = session.exec(select(DailyReport).where(DailyReport.student_id == student_id)).all()
-    for r in reports:
-        _try_delete_uploaded_file(r.image_path)
+    # Uploaded images for this student's reports (only the path column is needed)
+    image_paths = session.exec(
+        select(DailyReport.image_path)
+        .where(DailyReport.student_id == student_id)
+        .where(DailyReport.image_path.is_not(None))
+    ).all()
 
-    # Delete reports then student
+    # Delete reports then student; both go out in the session's single transaction
     session.exec(delete(DailyReport).where(DailyReport.student_id == student_id))
     session.delete(student)
     session.commit()
 
+    # Remove files once the rows are gone, after the response is sent
+    background.add_task(_bulk_unlink, image_paths)
+
     return RedirectResponse(url="/students?success=Student%20deleted", status_code=303)
 
 
@@ -241,7 +280,7 @@ def student_delete(
 def student_detail(
     student_id: int,
     request: Request,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_session_ro),
 ):
     redirect = _require_login(request)
     if redirect:
@@ -273,7 +312,7 @@ def student_detail(
 def report_list(
     student_id: int,
     request: Request,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_session_ro),
 ):
     redirect = _require_login(request)
     if redirect:
@@ -282,11 +321,13 @@ def report_list(
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
 
+    # Streamed in batches; the template iterates it once while rendering below.
     reports = session.exec(
         select(DailyReport)
         .where(DailyReport.student_id == student_id)
         .order_by(DailyReport.report_date.desc(), DailyReport.created_at.desc())
-    ).all()
+        .execution_options(yield_per=100)
+    )
 
     return templates.TemplateResponse(
         "report_list.html",
@@ -298,7 +339,7 @@ def report_list(
 def report_new(
     student_id: int,
     request: Request,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_session_ro),
 ):
     redirect = _require_login(request)
     if redirect:
@@ -313,13 +354,27 @@ def report_new(
     )
 
 
+def _nonempty_upload(image_file: UploadFile | None) -> UploadFile | None:
+    # Browsers submit an empty part when no file is picked; release its spooled file now.
+    if image_file is None:
+        return None
+    if not image_file.filename or image_file.size == 0:
+        image_file.file.close()
+        return None
+    return image_file
+
+
+# Blocking file I/O: only call from sync (`def`) handlers, which FastAPI already runs
+# in its threadpool. The handlers stay sync because their SQLite work is blocking too.
 def _save_upload(image_file: UploadFile) -> str:
-    original_name = (image_file.filename or "upload").replace("/", "_").replace("\\", "_")
-    out_name = f"{uuid4().hex}_{original_name}"
+    # Short random name; only the (lowercased, bounded) extension of the original is kept.
+    suffix = Path(image_file.filename or "").suffix.lower()[:10]
+    out_name = f"{secrets.token_urlsafe(12)}{suffix}"
     out_path = UPLOADS_DIR / out_name
 
     with out_path.open("wb") as f:
-        f.write(image_file.file.read())
+        # Stream in 1 MiB chunks rather than reading the whole upload into memory.
+        shutil.copyfileobj(image_file.file, f, length=UPLOAD_CHUNK_SIZE)
 
     return f"/uploads/{out_name}"
 
@@ -333,21 +388,25 @@ def create_report(
     rating: Optional[int] = Form(None),
     image_url: Optional[str] = Form(None),
     image_file: Optional[UploadFile] = File(None),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_session_rw),
 ) -> RedirectResponse:
     redirect = _require_login(request)
     if redirect:
         return redirect
-    student = session.get(Student, student_id)
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
-
     parsed_date = date.fromisoformat(report_date)
 
+    # Copy the upload before touching the DB so the single writer connection
+    # isn't held for the duration of the file write.
     image_path: str | None = None
-    if image_file and image_file.filename:
+    image_file = _nonempty_upload(image_file)
+    if image_file:
         image_path = _save_upload(image_file)
 
+    student = session.get(Student, student_id)
+    if not student:
+        _try_delete_uploaded_file(image_path)
+        raise HTTPException(status_code=404, detail="Student not found")
+
     report = DailyReport(
         student_id=student_id,
         report_date=parsed_date,
@@ -362,23 +421,30 @@ def create_report(
     return RedirectResponse(url=f"/students/{student_id}?success=Report%20saved", status_code=303)
 
 
+def _get_student_report(session: Session, student_id: int, report_id: int) -> DailyReport | None:
+    return session.exec(
+        select(DailyReport).where(DailyReport.id == report_id, DailyReport.student_id == student_id)
+    ).first()
+
+
 @app.get("/students/{student_id}/reports/{report_id}/edit", response_class=HTMLResponse)
 def report_edit_page(
     student_id: int,
     report_id: int,
     request: Request,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_session_ro),
 ):
     redirect = _require_login(request)
     if redirect:
         return redirect
-    student = session.get(Student, student_id)
-    if not student:
-        return RedirectResponse(url="/students?error=Student%20not%20found", status_code=303)
-
-    report = session.get(DailyReport, report_id)
-    if not report or report.student_id != student_id:
+    row = session.exec(
+        select(DailyReport, Student)
+        .join(Student, Student.id == DailyReport.student_id)
+        .where(DailyReport.id == report_id, DailyReport.student_id == student_id)
+    ).first()
+    if not row:
         return RedirectResponse(url=f"/students/{student_id}/reports?error=Report%20not%20found", status_code=303)
+    report, student = row
 
     return templates.TemplateResponse(
         "report_edit.html",
@@ -398,20 +464,25 @@ def report_edit_submit(
     clear_image_url: Optional[str] = Form(None),
     clear_image_upload: Optional[str] = Form(None),
     image_file: Optional[UploadFile] = File(None),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_session_rw),
 ) -> RedirectResponse:
     redirect = _require_login(request)
     if redirect:
         return redirect
-    student = session.get(Student, student_id)
-    if not student:
-        return RedirectResponse(url="/students?error=Student%20not%20found", status_code=303)
+    parsed_date = date.fromisoformat(report_date)
+
+    # Copy the upload before touching the DB (see create_report).
+    new_image_path: str | None = None
+    image_file = _nonempty_upload(image_file)
+    if image_file:
+        new_image_path = _save_upload(image_file)
 
-    report = session.get(DailyReport, report_id)
-    if not report or report.student_id != student_id:
+    report = _get_student_report(session, student_id, report_id)
+    if not report:
+        _try_delete_uploaded_file(new_image_path)
         return RedirectResponse(url=f"/students/{student_id}/reports?error=Report%20not%20found", status_code=303)
 
-    report.report_date = date.fromisoformat(report_date)
+    report.report_date = parsed_date
     report.notes = notes.strip()
     report.rating = rating
 
@@ -426,10 +497,10 @@ def report_edit_submit(
         _try_delete_uploaded_file(report.image_path)
         report.image_path = None
 
-    if image_file and image_file.filename:
+    if new_image_path:
         # Replace previous upload
         _try_delete_uploaded_file(report.image_path)
-        report.image_path = _save_upload(image_file)
+        report.image_path = new_image_path
 
     session.add(report)
     session.commit()
@@ -441,13 +512,13 @@ def report_delete(
     student_id: int,
     report_id: int,
     request: Request,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_session_rw),
 ) -> RedirectResponse:
     redirect = _require_login(request)
     if redirect:
         return redirect
-    report = session.get(DailyReport, report_id)
-    if not report or report.student_id != student_id:
+    report = _get_student_report(session, student_id, report_id)
+    if not report:
         return RedirectResponse(url=f"/students/{student_id}/reports?error=Report%20not%20found", status_code=303)
 
     _try_delete_uploaded_file(report.image_path)
@@ -462,7 +533,7 @@ def send_report_command(
     request: Request,
     background: BackgroundTasks,
     report_date: str = Form(...),
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_session_ro),
 ):
     redirect = _require_login(request)
     if redirect:
@@ -473,7 +544,15 @@ def send_report_command(
 
     parsed_date = date.fromisoformat(report_date)
 
-    report = session.exec(
+    # Recent reports are rendered either way; reuse them to find the requested date.
+    recent = session.exec(
+        select(DailyReport)
+        .where(DailyReport.student_id == student_id)
+        .order_by(DailyReport.report_date.desc(), DailyReport.created_at.desc())
+        .limit(10)
+    ).all()
+
+    report = next((r for r in recent if r.report_date == parsed_date), None) or session.exec(
         select(DailyReport)
         .where(DailyReport.student_id == student_id)
         .where(DailyReport.report_date == parsed_date)
@@ -486,12 +565,7 @@ def send_report_command(
             {
                 "request": request,
                 "student": student,
-                "reports": session.exec(
-                    select(DailyReport)
-                    .where(DailyReport.student_id == student_id)
-                    .order_by(DailyReport.report_date.desc(), DailyReport.created_at.desc())
-                    .limit(10)
-                ).all(),
+                "reports": recent,
                 "today": date.today().isoformat(),
                 "flash_error": f"No report found for {parsed_date}.",
                 **_base_template_context(request),
@@ -499,30 +573,33 @@ def send_report_command(
             status_code=404,
         )
 
-    subject = f"Dorm Report - {student.name} - {report.report_date}"
-
-    # Best-effort: build a base URL for clickable uploaded-image links.
-    public_base_url = str(request.base_url).rstrip("/")
-
-    html_body = templates.get_template("email_report.html").render(
-        student=student, report=report, public_base_url=public_base_url
-    )
-    text_body = (
-        f"Dorm Daily Report\n\n"
-        f"Student: {student.name}\n"
-        f"Date: {report.report_date}\n"
-        + (f"Rating: {report.rating}/5\n" if report.rating else "")
-        + f"\nNotes:\n{report.notes}\n"
-        + (f"\nImage link: {report.image_url}\n" if report.image_url else "")
-        + (
-            f"\nUploaded image: {public_base_url}{report.image_path}\n"
-            if report.image_path
-            else ""
-        )
-    )
-
     try:
         ensure_email_configured()
+    except EmailNotConfiguredError as e:
+        # Nothing will be sent, so skip rendering the email entirely.
+        flash_success = None
+        flash_error = str(e)
+    else:
+        subject = f"Dorm Report - {student.name} - {report.report_date}"
+
+        # Best-effort: build a base URL for clickable uploaded-image links.
+        public_base_url = str(request.base_url).rstrip("/")
+
+        html_body = EMAIL_REPORT_TEMPLATE.render(student=student, report=report, public_base_url=public_base_url)
+        text_body = (
+            f"Dorm Daily Report\n\n"
+            f"Student: {student.name}\n"
+            f"Date: {report.report_date}\n"
+            + (f"Rating: {report.rating}/5\n" if report.rating else "")
+            + f"\nNotes:\n{report.notes}\n"
+            + (f"\nImage link: {report.image_url}\n" if report.image_url else "")
+            + (
+                f"\nUploaded image: {public_base_url}{report.image_path}\n"
+                if report.image_path
+                else ""
+            )
+        )
+
         background.add_task(
             send_email,
             to_email=student.email,
@@ -532,16 +609,6 @@ def send_report_command(
         )
         flash_success = f"Queued email to {student.email} for {parsed_date}."
         flash_error = None
-    except EmailNotConfiguredError as e:
-        flash_success = None
-        flash_error = str(e)
-
-    recent = session.exec(
-        select(DailyReport)
-        .where(DailyReport.student_id == student_id)
-        .order_by(DailyReport.report_date.desc(), DailyReport.created_at.desc())
-        .limit(10)
-    ).all()
 
     return templates.TemplateResponse(
         "student_detail.html",
@@ -553,6 +620,5 @@ def send_report_command(
             "flash_success": flash_success,
             "flash_error": flash_error,
             "current_user": request.session.get("user"),
-            "google_configured": is_auth_configured(),
         },
     )
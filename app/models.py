@@ -3,6 +3,7 @@ from __future__ import annotations
 from datetime import date, datetime
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
@@ -22,10 +23,13 @@ class Student(SQLModel, table=True):
 
 
 class DailyReport(SQLModel, table=True):
+    # Serves "WHERE student_id = ? ORDER BY report_date DESC, created_at DESC" without a sort step.
+    __table_args__ = (Index("ix_report_student_date_created", "student_id", "report_date", "created_at"),)
+
     id: int | None = Field(default=None, primary_key=True)
 
-    student_id: int = Field(foreign_key="student.id", index=True)
-    report_date: date = Field(index=True)
+    student_id: int = Field(foreign_key="student.id")
+    report_date: date
 
     notes: str
     rating: Optional[int] = Field(default=None, ge=1, le=5)